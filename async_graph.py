@@ -0,0 +1,46 @@
+# Course: CS261 - Data Structures
+# Author: Christine Lantigua
+# Assignment: 6
+# Description: asyncio helpers that run the expensive graph methods off the
+#              event loop, with timeouts and coalescing of identical requests
+
+import asyncio
+
+# in-flight computations keyed by (loop, graph, version, method, args)
+_in_flight = dict()
+
+
+async def run_coalesced(graph, method: str, *args, timeout=None, executor=None):
+    """
+    Run graph.<method>(*args) in an executor and await the result
+
+    The method runs on graph.snapshot() so writes made on the event loop while
+    it is running can not be seen half way through. Identical calls made while
+    one is still running share that computation instead of starting another.
+
+    Cancelling the caller, or hitting the timeout, only stops the caller from
+    waiting: the shared computation keeps going for any other waiters, and
+    keeps its executor thread or process busy until it finishes, since work
+    handed to an executor can not be interrupted. Size the executor with that
+    in mind. A timeout raises asyncio.TimeoutError
+
+    Snapshots can be pickled, so a ProcessPoolExecutor may be passed to keep
+    CPU bound work from competing with the event loop for the GIL
+    """
+    loop = asyncio.get_running_loop()
+
+    # the graph itself, not its id, is part of the key so it stays alive (and its
+    # id can not be reused by another graph) while the computation is in flight
+    key = (loop, graph, graph.version, method, args)
+
+    future = _in_flight.get(key)
+
+    # no identical request is running -- start one on the snapshot
+    if future is None:
+        target = graph.snapshot()
+        future = loop.run_in_executor(executor, getattr(target, method), *args)
+        _in_flight[key] = future
+        future.add_done_callback(lambda _: _in_flight.pop(key, None))
+
+    # shield so one waiter giving up does not cancel the computation for the others
+    return await asyncio.wait_for(asyncio.shield(future), timeout)
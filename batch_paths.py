@@ -0,0 +1,79 @@
+# Course: CS261 - Data Structures
+# Author: Christine Lantigua
+# Assignment: 6
+# Description: helpers shared by both graph classes for checking large batches
+#              of paths, optionally spread over worker processes
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+# path check function and lookup table handed to each worker process
+_worker_check = None
+_worker_lookup = None
+
+
+def first_invalid_indices(check, lookup, paths, workers=None, chunk_size=10000) -> []:
+    """
+    Return check(lookup, path) for every path, in order
+
+    check must be a module level function so it can be sent to worker processes.
+    With workers > 1 the paths are checked in chunks across that many processes,
+    and lookup is sent to each process once
+    """
+    if workers is None or workers <= 1:
+        return [check(lookup, path) for path in paths]
+
+    results = []
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(check, lookup)) as executor:
+
+        # two chunks per worker keeps every process busy without reading ahead
+        for chunk_result in map_bounded(executor, _check_chunk, chunks(paths, chunk_size), 2 * workers):
+            results.extend(chunk_result)
+
+    return results
+
+
+def chunks(items, chunk_size):
+    """
+    Yield lists of up to chunk_size items from any iterable
+    """
+    items = iter(items)
+    chunk = list(islice(items, chunk_size))
+
+    while chunk:
+        yield chunk
+        chunk = list(islice(items, chunk_size))
+
+
+def map_bounded(executor, fn, items, limit):
+    """
+    Yield fn(item) for every item in order, like executor.map(), but submit
+    at most limit items ahead so a huge input is never all queued in memory
+    """
+    pending = deque()
+
+    for item in items:
+        pending.append(executor.submit(fn, item))
+
+        if len(pending) >= limit:
+            yield pending.popleft().result()
+
+    while pending:
+        yield pending.popleft().result()
+
+
+def _init_worker(check, lookup):
+    """
+    Store the check function and lookup table once per worker process
+    """
+    global _worker_check, _worker_lookup
+    _worker_check = check
+    _worker_lookup = lookup
+
+
+def _check_chunk(paths):
+    """
+    Check a chunk of paths inside a worker process
+    """
+    return [_worker_check(_worker_lookup, path) for path in paths]
@@ -4,7 +4,68 @@
 # Description: Directed Graph methods created from scratch
 
 import heapq
-from collections import deque
+import sys
+import threading
+import time
+import weakref
+from array import array
+from collections import deque, namedtuple
+
+from async_graph import run_coalesced
+from batch_paths import first_invalid_indices
+
+# typecode of the matrix rows and edge buffers: 4 byte unsigned ints instead of
+# an 8 byte pointer per slot, which caps weights at MAX_WEIGHT
+WEIGHT_TYPECODE = 'I'
+MAX_WEIGHT = 2 ** (8 * array(WEIGHT_TYPECODE).itemsize) - 1
+
+# largest edge weight dial() keeps buckets for, heavier graphs use dijkstra()
+DIAL_MAX_WEIGHT = 1 << 16
+
+# one entry of a graph's change log: op is 'add_vertex' (src and dst are the new
+# vertex), 'add_edge' or 'remove_edge', with the weight before and after the write
+Change = namedtuple('Change', ['version', 'op', 'src', 'dst', 'old_weight', 'new_weight'])
+
+
+class EdgeArrays:
+    """
+    Edge list stored as three parallel arrays (sources, destinations, weights)
+    rather than a list of tuples. Iterating still yields (src, dst, weight) tuples
+    """
+
+    __slots__ = ('src', 'dst', 'weight')
+
+    def __init__(self):
+        self.src = array(WEIGHT_TYPECODE)
+        self.dst = array(WEIGHT_TYPECODE)
+        self.weight = array(WEIGHT_TYPECODE)
+
+    def __len__(self):
+        return len(self.src)
+
+    def __getitem__(self, index):
+        return self.src[index], self.dst[index], self.weight[index]
+
+    def __iter__(self):
+        return zip(self.src, self.dst, self.weight)
+
+
+def _first_invalid_index(adj_matrix, path):
+    """
+    Return the index of the first vertex of path that does not exist (including
+    anything that is not an int) or has no edge from the vertex before it,
+    None if the whole path is valid
+    """
+    v_count = len(adj_matrix)
+
+    for index, vertex in enumerate(path):
+        if not isinstance(vertex, int) or not 0 <= vertex < v_count:
+            return index
+
+        if index > 0 and adj_matrix[path[index - 1]][vertex] == 0:
+            return index
+
+    return None
 
 
 class DirectedGraph:
@@ -12,10 +73,30 @@ class DirectedGraph:
     Class to implement directed weighted graph
     - duplicate edges not allowed
     - loops not allowed
-    - only positive edge weights
+    - only positive integer edge weights, up to MAX_WEIGHT
     - vertex names are integers
+
+    Readers that run in other threads should use a snapshot() rather than the
+    live graph, in the same way as UndirectedGraph
     """
 
+    __slots__ = ('v_count', 'adj_matrix', '_in_degree', '_out_degree',
+                 '_version', '_snapshot', '_change_log', '_change_watchers', '_write_lock')
+
+    def __new__(cls, *args, **kwargs):
+        """
+        Set up the bookkeeping slots before __init__ runs
+        """
+        graph = super().__new__(cls)
+        graph._write_lock = threading.RLock()
+        graph._version = 0
+        graph._snapshot = None
+        graph._change_log = []
+        graph._change_watchers = None
+        graph._in_degree = array(WEIGHT_TYPECODE)
+        graph._out_degree = array(WEIGHT_TYPECODE)
+        return graph
+
     def __init__(self, start_edges=None):
         """
         Store graph info as adjacency matrix
@@ -59,21 +140,32 @@ class DirectedGraph:
         Method adds a new vertex to the graph. Vertex name does not need to be provided,
         instead vertex will be assigned to a reference index (int).
         """
+        self._check_writable()
+
+        with self._write_lock:
+            # add one to self.v_count
+            self.v_count += 1
+            self.adj_matrix.append(array(WEIGHT_TYPECODE, [0]) * self.v_count)
+
+            # append value to matrix within the range of count
+            for i in range(self.v_count - 1):
+                self.adj_matrix[i].append(0)
 
-        # add one to self.v_count
-        self.v_count += 1
-        self.adj_matrix.append([0] * self.v_count)
+            self._in_degree.append(0)
+            self._out_degree.append(0)
 
-        # append value to matrix within the range of count
-        for i in range(self.v_count - 1):
-            self.adj_matrix[i].append(0)
+            self._publish('add_vertex', self.v_count - 1, self.v_count - 1, 0, 0)
 
-        return self.v_count
+            return self.v_count
 
     def add_edge(self, src: int, dst: int, weight=1) -> None:
         """
         Adds an edge to a directed graph
+
+        Weights are stored in a compact integer matrix, so a weight that is not
+        an int raises TypeError and one above MAX_WEIGHT raises ValueError
         """
+        self._check_writable()
 
         # src or dst is equal to one another or >= the graph
         if src >= self.v_count or src < 0:
@@ -89,14 +181,34 @@ class DirectedGraph:
         if weight <= 0:
             return
 
-        self.adj_matrix[src][dst] = weight
+        # weight can not be stored in a matrix slot
+        if not isinstance(weight, int):
+            raise TypeError(f'edge weights must be integers, got {weight!r}')
+
+        if weight > MAX_WEIGHT:
+            raise ValueError(f'edge weight {weight} is larger than MAX_WEIGHT ({MAX_WEIGHT})')
+
+        with self._write_lock:
+            old_weight = self.adj_matrix[src][dst]
+
+            # edge already has this weight -- nothing to publish
+            if old_weight == weight:
+                return
 
-        pass
+            self.adj_matrix[src][dst] = weight
+
+            # a brand new edge, not just a new weight
+            if old_weight == 0:
+                self._out_degree[src] += 1
+                self._in_degree[dst] += 1
+
+            self._publish('add_edge', src, dst, old_weight, weight)
 
     def remove_edge(self, src: int, dst: int) -> None:
         """
         Removes an edge from a directed graph
         """
+        self._check_writable()
 
         # does not exist on graph
         if src >= self.v_count or src < 0:
@@ -106,9 +218,133 @@ class DirectedGraph:
             return
 
         # change the weight to 0 at specified matrix position
-        self.adj_matrix[src][dst] = 0
+        with self._write_lock:
+            old_weight = self.adj_matrix[src][dst]
+
+            # there is no edge to remove -- nothing to publish
+            if old_weight == 0:
+                return
+
+            self.adj_matrix[src][dst] = 0
+            self._out_degree[src] -= 1
+            self._in_degree[dst] -= 1
+
+            self._publish('remove_edge', src, dst, old_weight, 0)
+
+    def _check_writable(self) -> None:
+        """
+        Raise TypeError when called on a snapshot, which every reader shares
+        """
+        if self._snapshot is self:
+            raise TypeError('graph snapshots are read-only')
+
+    def _publish(self, op: str, src: int, dst: int, old_weight: int, new_weight: int) -> None:
+        """
+        Bump the version, record the write in the change log if anything is
+        watching it and drop the published snapshot. Callers must hold the write lock
+        """
+        self._version += 1
+        self._snapshot = None
+
+        if self._change_watchers:
+            self._change_log.append(Change(self._version, op, src, dst, old_weight, new_weight))
+        elif self._change_log:
+            # the last watcher has gone away
+            self._change_log.clear()
+
+    def add_change_watcher(self, watcher) -> None:
+        """
+        Start keeping the change log for watcher, an object with a version
+        attribute holding the last graph version it has caught up with
+
+        Writes are only logged while at least one watcher is alive (watchers are
+        held by weak reference), and trim_change_log() drops what every watcher
+        has already seen, so graphs nobody watches pay nothing for the log
+        """
+        with self._write_lock:
+            if self._change_watchers is None:
+                self._change_watchers = weakref.WeakSet()
+
+            self._change_watchers.add(watcher)
+
+    def changes_since(self, version: int):
+        """
+        Return the list of changes made after the given version, or None if
+        some of them were not logged or have already been trimmed
+        """
+        log = self._change_log
+
+        # the log no longer reaches back to the write right after version
+        first = log[0].version if log else self._version + 1
+        if first > version + 1:
+            return None
+
+        # logged versions are consecutive, so the position follows from the first one
+        return log[max(0, version - first + 1):]
+
+    def trim_change_log(self, version=None) -> None:
+        """
+        Drop the change log entries up to and including the given version,
+        by default up to the oldest version any watcher still needs
+        """
+        with self._write_lock:
+            log = self._change_log
+            if not log:
+                return
+
+            if version is None:
+                watchers = self._change_watchers or ()
+                version = min((watcher.version for watcher in watchers), default=self._version)
+
+            del log[:max(0, version - log[0].version + 1)]
+
+    def snapshot(self):
+        """
+        Return a copy of the graph that readers can use without locking
+
+        The copy is built once per version and shared until the next write,
+        so it is read-only: add_vertex(), add_edge() and remove_edge() raise TypeError
+        """
 
-        pass
+        # grab the published snapshot without locking, writers replace it atomically
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+
+        with self._write_lock:
+            if self._snapshot is None:
+                snapshot = DirectedGraph()
+                snapshot.v_count = self.v_count
+                snapshot.adj_matrix = [row[:] for row in self.adj_matrix]
+                snapshot._in_degree = self._in_degree[:]
+                snapshot._out_degree = self._out_degree[:]
+                snapshot._version = self._version
+                snapshot._snapshot = snapshot
+                self._snapshot = snapshot
+
+            return self._snapshot
+
+    @property
+    def version(self) -> int:
+        """
+        Return the number of writes applied to the graph so far
+        """
+        return self._version
+
+    def __getstate__(self):
+        """
+        Return the graph's data for pickling, e.g. to hand a snapshot to a
+        process pool. The lock and change log are left out
+        """
+        return (self.v_count, self.adj_matrix, self._in_degree, self._out_degree,
+                self._version, self._snapshot is self)
+
+    def __setstate__(self, state):
+        """
+        Restore a pickled graph
+        """
+        self.v_count, self.adj_matrix, self._in_degree, self._out_degree, self._version, frozen = state
+        self._snapshot = self if frozen else None
 
     def get_vertices(self) -> []:
         """
@@ -159,6 +395,21 @@ class DirectedGraph:
 
         return edges
 
+    def get_edge_arrays(self) -> EdgeArrays:
+        """
+        Return the same edges as get_edges() in an EdgeArrays buffer
+        """
+        edges = EdgeArrays()
+
+        for src in range(self.v_count):
+            for dst, weight in enumerate(self.adj_matrix[src]):
+                if weight != 0:
+                    edges.src.append(src)
+                    edges.dst.append(dst)
+                    edges.weight.append(weight)
+
+        return edges
+
     def is_valid_path(self, path: []) -> bool:
         """
         This method takes a list of vertex indices and returns True if the
@@ -166,40 +417,25 @@ class DirectedGraph:
         in the list to the last vertex in the list, at each step traversing over an edge in the graph)
         """
 
-        length_of_path = len(path)
-
-        # empty path is automatically true
-        if length_of_path == 0:
-            return True
-
-        # path has one value, check if that value exists within vertices before returning True
-        if length_of_path == 1 and path[0] in self.get_vertices():
-            return True
-
-        # grab the list of edges
-        edges = self.get_edges()
-
-        # loop through each index of path
-        for index in range(0, length_of_path - 1):
-
-            vertex_to_look_for = path[index]
-            found_match = False
+        # each hop is a single matrix lookup instead of a scan of get_edges()
+        return _first_invalid_index(self.adj_matrix, path) is None
 
-            # loop through each edge tuple within edges list
-            for edge in edges:
-                v, e, w = edge[0], edge[1], edge[2]
+    def validate_paths(self, paths, workers=None, chunk_size=10000) -> []:
+        """
+        Check many paths at once and return one (is_valid, failed_at) tuple per path
 
-                # vertex within tuple matches the vertex we're looking for
-                if v == vertex_to_look_for:
+        failed_at is the index of the first vertex in the path that does not exist
+        or can not be reached from the vertex before it, None for a valid path.
+        With workers > 1 the paths are checked in chunks across that many processes,
+        reading only a few chunks of paths ahead of the results
+        """
 
-                    # edge matches the next index to look for within path
-                    if e == path[index + 1]:
-                        found_match = True
+        # validate against a snapshot so a write halfway through the batch is not seen
+        adj_matrix = self.snapshot().adj_matrix
 
-            if not found_match:
-                return False
+        failed = first_invalid_indices(_first_invalid_index, adj_matrix, paths, workers, chunk_size)
 
-        return True
+        return [(index is None, index) for index in failed]
 
     def dfs(self, v_start, v_end=None, check_for_cycle=False) -> []:
         """
@@ -334,6 +570,194 @@ class DirectedGraph:
 
         return False
 
+    def _out_neighbors(self, v: int):
+        """
+        Yield the destinations of v's outgoing edges by scanning only row v
+        """
+        for dst, weight in enumerate(self.adj_matrix[v]):
+            if weight != 0:
+                yield dst
+
+    def out_degree(self, v: int) -> int:
+        """
+        Return the number of edges leaving v, 0 if v is not in the graph
+        """
+        if not 0 <= v < self.v_count:
+            return 0
+
+        return self._out_degree[v]
+
+    def in_degree(self, v: int) -> int:
+        """
+        Return the number of edges entering v, 0 if v is not in the graph
+        """
+        if not 0 <= v < self.v_count:
+            return 0
+
+        return self._in_degree[v]
+
+    def neighbors(self, v: int) -> []:
+        """
+        Return the destinations of v's outgoing edges in ascending order
+        """
+        if not 0 <= v < self.v_count:
+            return []
+
+        return list(self._out_neighbors(v))
+
+    def k_hop_neighborhood(self, v: int, k: int) -> dict:
+        """
+        Return {vertex: hops} for every vertex reachable from v over at most
+        k outgoing edges, v itself included at 0 hops
+        """
+        if not 0 <= v < self.v_count:
+            return dict()
+
+        hops = {v: 0}
+        frontier = [v]
+
+        # expand one level at a time, scanning only the rows of the frontier
+        for level in range(1, k + 1):
+            next_frontier = []
+
+            for vertex in frontier:
+                for dst in self._out_neighbors(vertex):
+                    if dst not in hops:
+                        hops[dst] = level
+                        next_frontier.append(dst)
+
+            frontier = next_frontier
+
+        return hops
+
+    def induced_subgraph(self, vertices) -> ():
+        """
+        Return (graph, kept) where graph holds the given vertices and every edge
+        between them. Vertex i of graph is kept[i]: the given vertices in order,
+        without duplicates and without any that are not in this graph
+        """
+        kept = []
+        seen = set()
+        for vertex in vertices:
+            if 0 <= vertex < self.v_count and vertex not in seen:
+                seen.add(vertex)
+                kept.append(vertex)
+
+        subgraph = DirectedGraph()
+        for _ in kept:
+            subgraph.add_vertex()
+
+        # only the kept rows and columns of the matrix are read
+        for i, src in enumerate(kept):
+            row = self.adj_matrix[src]
+            for j, dst in enumerate(kept):
+                if row[dst] != 0:
+                    subgraph.add_edge(i, j, row[dst])
+
+        return subgraph, kept
+
+    def strongly_connected_components(self) -> []:
+        """
+        Return a list with the strongly connected component label of each vertex
+
+        Uses an iterative version of Tarjan's algorithm, so deep graphs do not hit
+        the recursion limit. Labels run from 0 in topological order of the components:
+        every edge between two components goes from a lower label to a higher one
+        """
+        n = self.v_count
+        index = [-1] * n
+        low = [0] * n
+        on_stack = [False] * n
+        stack = []
+        labels = [-1] * n
+        counter = 0
+        component_count = 0
+
+        for root in range(n):
+            if index[root] != -1:
+                continue
+
+            index[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = True
+
+            # each frame is a vertex and the iterator over its remaining neighbours
+            work = [(root, self._out_neighbors(root))]
+
+            while work:
+                v, neighbours = work[-1]
+
+                for w in neighbours:
+                    # unvisited neighbour -- descend into it and resume v later
+                    if index[w] == -1:
+                        index[w] = low[w] = counter
+                        counter += 1
+                        stack.append(w)
+                        on_stack[w] = True
+                        work.append((w, self._out_neighbors(w)))
+                        break
+
+                    if on_stack[w]:
+                        low[v] = min(low[v], index[w])
+
+                # every neighbour of v has been handled
+                else:
+                    work.pop()
+
+                    if work:
+                        parent = work[-1][0]
+                        low[parent] = min(low[parent], low[v])
+
+                    # v is the root of a component -- pop it off the stack
+                    if low[v] == index[v]:
+                        while True:
+                            w = stack.pop()
+                            on_stack[w] = False
+                            labels[w] = component_count
+                            if w == v:
+                                break
+                        component_count += 1
+
+        # tarjan finishes components in reverse topological order
+        return [component_count - 1 - label for label in labels]
+
+    def condensation(self) -> ():
+        """
+        Return (graph, labels) where graph has one vertex per strongly connected
+        component and labels maps each original vertex to its component vertex
+
+        An edge between two components weighs as much as the lightest original edge
+        between them. The condensed graph is acyclic, and u can reach v in the original
+        graph exactly when labels[u] can reach labels[v] in the condensed one
+        """
+        labels = self.strongly_connected_components()
+        component_count = max(labels) + 1 if labels else 0
+
+        # lightest edge between each pair of components
+        lightest = dict()
+        for src in range(self.v_count):
+            for dst, weight in enumerate(self.adj_matrix[src]):
+                if weight != 0 and labels[src] != labels[dst]:
+                    key = (labels[src], labels[dst])
+                    if key not in lightest or weight < lightest[key]:
+                        lightest[key] = weight
+
+        condensed = DirectedGraph()
+        for _ in range(component_count):
+            condensed.add_vertex()
+
+        for (src, dst), weight in lightest.items():
+            condensed.add_edge(src, dst, weight)
+
+        return condensed, labels
+
+    def reachability_index(self):
+        """
+        Return a ReachabilityIndex built from the current state of the graph
+        """
+        return ReachabilityIndex(self)
+
     def __find_minimum(self, weight, output_list):
         """
         helper function for dijkstra's algorithm
@@ -343,7 +767,7 @@ class DirectedGraph:
 
         # initialize minimum values
         min_index = 0
-        min_val = 2147483646  # infinity
+        min_val = float('inf')
 
         # loop through each index in self.v_counter until absolute minimum value reached
         for number in range(self.v_count):
@@ -373,8 +797,9 @@ class DirectedGraph:
         the help from geeksforgeeks
         """
 
-        # set each value to numbers outside of src value to be reassigned to infinity later
-        dist = [2147483646] * self.v_count
+        # set each value outside of src to infinity, a real infinity rather than a large
+        # number so no sum of edge weights (up to MAX_WEIGHT each) can be mistaken for it
+        dist = [float('inf')] * self.v_count
 
         # set the first value equal to 0 and create shortest path list with iterations of false
         dist[src] = 0
@@ -399,14 +824,295 @@ class DirectedGraph:
                         # update the distance value
                         dist[index] = dist[min_vertex] + vertex
 
-        # reassign value of 2147483646 to float of inf as it could not be assigned initially
-        # before returning dist
-        for index in range(0, len(dist)):
-            if dist[index] == 2147483646:
-                dist[index] = float('inf')
+        return dist
+
+    def dial(self, src: int) -> []:
+        """
+        Return the same distances as dijkstra() using Dial's bucket queue
+
+        Edge weights are positive integers, so tentative distances can be kept in
+        max_weight + 1 buckets used round robin instead of a heap. The run takes
+        O(V^2 + V * max_weight) on the adjacency matrix, which beats dijkstra()
+        when weights are small. Graphs with a weight above DIAL_MAX_WEIGHT would
+        need too many buckets, so they fall back to dijkstra()
+        """
+        max_weight = max((max(row) for row in self.adj_matrix), default=0)
+
+        if max_weight > DIAL_MAX_WEIGHT:
+            return self.dijkstra(src)
+
+        dist = [float('inf')] * self.v_count
+        dist[src] = 0
+
+        # bucket d % size holds the vertices whose tentative distance is d
+        size = max_weight + 1
+        buckets = [[] for _ in range(size)]
+        buckets[0].append(src)
+        pending = 1
+        current = 0
+
+        while pending:
+            bucket = buckets[current % size]
+
+            while bucket:
+                vertex = bucket.pop()
+                pending -= 1
+
+                # stale entry -- the vertex has since been given a shorter distance
+                if dist[vertex] != current:
+                    continue
+
+                for dst, weight in enumerate(self.adj_matrix[vertex]):
+                    if weight != 0 and current + weight < dist[dst]:
+                        dist[dst] = current + weight
+                        buckets[dist[dst] % size].append(dst)
+                        pending += 1
+
+            current += 1
 
         return dist
 
+    async def dijkstra_async(self, src: int, timeout=None, executor=None) -> []:
+        """
+        Awaitable dijkstra() that runs in an executor instead of blocking the event loop
+        """
+        return await run_coalesced(self, 'dijkstra', src, timeout=timeout, executor=executor)
+
+    async def has_cycle_async(self, timeout=None, executor=None):
+        """
+        Awaitable has_cycle() that runs in an executor instead of blocking the event loop
+        """
+        return await run_coalesced(self, 'has_cycle', timeout=timeout, executor=executor)
+
+
+class ReachabilityIndex:
+    """
+    Precomputed answers to "can u reach v?" for a mostly static DirectedGraph
+
+    The graph is condensed into its strongly connected components and every
+    component keeps a bitset (bytes) of the components it can reach, so a query
+    is two label lookups and a single byte test whatever the number of components.
+    Components are labelled in topological order, so a component only ever reaches
+    higher labels and its bitset starts at its own label.
+
+    The index does not follow later writes to the graph: check is_stale() and
+    call rebuild() when needed
+    """
+
+    __slots__ = ('graph', 'labels', 'reach', 'version', 'build_seconds')
+
+    def __init__(self, graph: DirectedGraph):
+        self.graph = graph
+        self.rebuild()
+
+    def rebuild(self) -> None:
+        """
+        Recompute the index from the graph's current snapshot
+        """
+        start = time.perf_counter()
+
+        snapshot = self.graph.snapshot()
+        condensed, labels = snapshot.condensation()
+
+        # components are labelled in topological order, so walking them backwards
+        # means every successor's bitset is complete before it is needed
+        reach = [0] * condensed.v_count
+        for component in range(condensed.v_count - 1, -1, -1):
+            bits = 1 << component
+            for successor in condensed._out_neighbors(component):
+                bits |= reach[successor]
+            reach[component] = bits
+
+        # store each bitset as bytes starting from the component's own bit
+        for component, bits in enumerate(reach):
+            bits >>= component
+            reach[component] = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+
+        self.labels = array(WEIGHT_TYPECODE, labels)
+        self.reach = reach
+        self.version = snapshot.version
+        self.build_seconds = time.perf_counter() - start
+
+    def can_reach(self, src: int, dst: int) -> bool:
+        """
+        Return True if there is a path from src to dst (every vertex reaches itself)
+        """
+        vertex_count = len(self.labels)
+
+        if not 0 <= src < vertex_count or not 0 <= dst < vertex_count:
+            return False
+
+        src_label, dst_label = self.labels[src], self.labels[dst]
+
+        # components never reach a lower label
+        offset = dst_label - src_label
+        if offset < 0:
+            return False
+
+        bits = self.reach[src_label]
+        return offset >> 3 < len(bits) and (bits[offset >> 3] >> (offset & 7)) & 1 == 1
+
+    def is_stale(self) -> bool:
+        """
+        Return True if the graph has been written to since the index was built
+        """
+        return self.graph.version != self.version
+
+    def memory_bytes(self) -> int:
+        """
+        Return the approximate memory used by the index in bytes
+        """
+        return (sys.getsizeof(self.labels) + sys.getsizeof(self.reach)
+                + sum(sys.getsizeof(bits) for bits in self.reach))
+
+
+class DynamicShortestPaths:
+    """
+    Shortest path distances from one source that are kept up to date by
+    replaying the graph's change log instead of rerunning dijkstra()
+
+    refresh() only touches the vertices whose distance can change: edge insertions
+    and weight decreases are relaxed outwards from the changed edge, while removals
+    and weight increases on the shortest path tree reset just the subtree below that
+    edge and settle it again from its remaining incoming edges
+
+    Creating one turns on the graph's change log, which then grows with every
+    write until the oldest watcher calls refresh()
+    """
+
+    __slots__ = ('graph', 'src', 'dist', 'parent', 'children', 'version', '__weakref__')
+
+    def __init__(self, graph: DirectedGraph, src: int):
+        self.graph = graph
+        self.src = src
+
+        # register in the same locked step so no write slips in unlogged
+        with graph._write_lock:
+            self.recompute()
+            graph.add_change_watcher(self)
+
+    def recompute(self) -> []:
+        """
+        Rebuild the distances and shortest path tree from scratch
+        """
+        graph = self.graph
+
+        with graph._write_lock:
+            self.version = graph.version
+            self.dist = [float('inf')] * graph.v_count
+            self.parent = [None] * graph.v_count
+            self.children = [set() for _ in range(graph.v_count)]
+
+            self.dist[self.src] = 0
+            self._settle([(0, self.src)])
+
+            graph.trim_change_log()
+
+        return self.dist
+
+    def refresh(self) -> []:
+        """
+        Apply the changes made to the graph since the last refresh and return
+        the distance list, in the same form dijkstra() returns it
+        """
+        graph = self.graph
+
+        with graph._write_lock:
+            changes = graph.changes_since(self.version)
+
+            # the change log was trimmed past our version
+            if changes is None:
+                return self.recompute()
+
+            self.version = graph.version
+
+            # new vertices start out unreachable
+            for _ in range(len(self.dist), graph.v_count):
+                self.dist.append(float('inf'))
+                self.parent.append(None)
+                self.children.append(set())
+
+            touched = {(change.src, change.dst) for change in changes if change.op != 'add_vertex'}
+
+            # tree edges that were removed or got heavier invalidate the subtree below them
+            affected = set()
+            for src, dst in touched:
+                weight = graph.adj_matrix[src][dst]
+                if self.parent[dst] == src and (weight == 0 or self.dist[src] + weight > self.dist[dst]):
+                    self._invalidate(dst, affected)
+
+            # affected vertices restart from their best incoming edge outside the subtree
+            heap = []
+            for vertex in affected:
+                for src in range(graph.v_count):
+                    weight = graph.adj_matrix[src][vertex]
+                    if weight != 0 and self.dist[src] + weight < self.dist[vertex]:
+                        self._set_parent(vertex, src, self.dist[src] + weight)
+
+                if self.dist[vertex] != float('inf'):
+                    heap.append((self.dist[vertex], vertex))
+
+            # new or lighter edges may shorten the path to their destination
+            for src, dst in touched:
+                weight = graph.adj_matrix[src][dst]
+                if weight != 0 and self.dist[src] + weight < self.dist[dst]:
+                    self._set_parent(dst, src, self.dist[src] + weight)
+                    heap.append((self.dist[dst], dst))
+
+            heapq.heapify(heap)
+            self._settle(heap)
+
+            # entries every watcher has now seen are no longer needed
+            graph.trim_change_log()
+
+        return self.dist
+
+    def _invalidate(self, root: int, affected: set) -> None:
+        """
+        Mark root and everything below it in the shortest path tree as unreachable
+        """
+        if self.parent[root] is not None:
+            self.children[self.parent[root]].discard(root)
+
+        stack = [root]
+        while stack:
+            vertex = stack.pop()
+            affected.add(vertex)
+            stack.extend(self.children[vertex])
+
+            self.dist[vertex] = float('inf')
+            self.parent[vertex] = None
+            self.children[vertex] = set()
+
+    def _set_parent(self, vertex: int, parent: int, distance: int) -> None:
+        """
+        Move vertex under parent in the shortest path tree at the given distance
+        """
+        if self.parent[vertex] is not None:
+            self.children[self.parent[vertex]].discard(vertex)
+
+        self.parent[vertex] = parent
+        self.children[parent].add(vertex)
+        self.dist[vertex] = distance
+
+    def _settle(self, heap: []) -> None:
+        """
+        Run dijkstra from the vertices on the heap until no distance improves
+        """
+        adj_matrix = self.graph.adj_matrix
+
+        while heap:
+            distance, vertex = heapq.heappop(heap)
+
+            # stale entry -- the vertex has since been given a shorter distance
+            if distance != self.dist[vertex]:
+                continue
+
+            for dst, weight in enumerate(adj_matrix[vertex]):
+                if weight != 0 and distance + weight < self.dist[dst]:
+                    self._set_parent(dst, vertex, distance + weight)
+                    heapq.heappush(heap, (distance + weight, dst))
+
 
 if __name__ == '__main__':
 
@@ -481,3 +1187,70 @@ if __name__ == '__main__':
     # print('\n', g)
     # for i in range(5):
     #     print(f'DIJKSTRA {i} {g.dijkstra(i)}')
+
+    import random
+
+    def random_graph(rng, max_vertices=12, max_edges=30, max_weight=9):
+        """builds a random graph for the randomized checks below"""
+        graph = DirectedGraph()
+        for _ in range(rng.randint(1, max_vertices)):
+            graph.add_vertex()
+        for _ in range(rng.randint(0, max_edges)):
+            src, dst = rng.randrange(graph.v_count), rng.randrange(graph.v_count)
+            graph.add_edge(src, dst, rng.randint(1, max_weight))
+        return graph
+
+    print("\nRANDOM - strongly_connected_components() / condensation() vs dfs()")
+    print("-------------------------------------------------------------------")
+    rng = random.Random(31)
+    for _ in range(300):
+        g = random_graph(rng)
+        condensed, labels = g.condensation()
+        reaches = [set(g.dfs(v)) for v in g.get_vertices()]
+        for u in g.get_vertices():
+            for v in g.get_vertices():
+                mutual = v in reaches[u] and u in reaches[v]
+                assert (labels[u] == labels[v]) == mutual, (u, v, g)
+                assert (v in reaches[u]) == (labels[v] in condensed.dfs(labels[u])), (u, v, g)
+    print('300 random graphs match')
+
+    print("\nRANDOM - ReachabilityIndex.can_reach() vs dfs()")
+    print("----------------------------------------------")
+    rng = random.Random(32)
+    for _ in range(300):
+        g = random_graph(rng)
+        index = g.reachability_index()
+        for u in g.get_vertices():
+            reaches = set(g.dfs(u))
+            for v in g.get_vertices():
+                assert index.can_reach(u, v) == (v in reaches), (u, v, g)
+    print('300 random graphs match')
+
+    print("\nRANDOM - dial() vs dijkstra()")
+    print("-----------------------------")
+    rng = random.Random(33)
+    for _ in range(300):
+        g = random_graph(rng, max_weight=100)
+        for src in g.get_vertices():
+            assert g.dial(src) == g.dijkstra(src), (src, g)
+    print('300 random graphs match')
+
+    print("\nRANDOM - DynamicShortestPaths.refresh() vs dijkstra()")
+    print("-----------------------------------------------------")
+    rng = random.Random(34)
+    for _ in range(300):
+        g = random_graph(rng)
+        src = rng.randrange(g.v_count)
+        paths = DynamicShortestPaths(g, src)
+        for _ in range(10):
+            for _ in range(rng.randint(1, 5)):
+                u, v = rng.randrange(g.v_count), rng.randrange(g.v_count)
+                choice = rng.random()
+                if choice < 0.1:
+                    g.add_vertex()
+                elif choice < 0.5:
+                    g.remove_edge(u, v)
+                else:
+                    g.add_edge(u, v, rng.randint(1, 9))
+            assert paths.refresh() == g.dijkstra(src), g
+    print('300 random graphs match')
@@ -7,7 +7,190 @@
 #
 
 import heapq
+import math
+import multiprocessing
+import numbers
+import sys
+import threading
+import zlib
 from collections import deque
+from itertools import count
+from types import MappingProxyType
+
+from async_graph import run_coalesced
+from batch_paths import first_invalid_indices
+
+
+def _first_invalid_index(neighbours, path):
+    """
+    Return the index of the first vertex of path that is not in the graph or is
+    not a neighbour of the vertex before it, None if the whole path is valid
+    """
+    for index, vertex in enumerate(path):
+        if vertex not in neighbours:
+            return index
+
+        if index > 0 and vertex not in neighbours[path[index - 1]]:
+            return index
+
+    return None
+
+
+def _sorted_neighbours(edges):
+    """
+    Return edges in sorted order, snapshots already hold them as sorted tuples
+    """
+    return edges if isinstance(edges, tuple) else sorted(edges)
+
+
+def _intern(name):
+    """
+    Intern string vertex names so every neighbour list shares one string per
+    vertex, other hashable names are used as they are
+    """
+    return sys.intern(name) if isinstance(name, str) else name
+
+
+def _edge_key(u, v):
+    """
+    Return the key an undirected edge's weight is stored under, a frozenset
+    so vertex names never have to be comparable with each other
+    """
+    return frozenset((u, v))
+
+
+def hash_owner(vertex, k: int) -> int:
+    """
+    Return the shard (0 to k - 1) that owns vertex under hash partitioning
+
+    crc32 of the name rather than hash() so every process agrees on the owner
+    """
+    return zlib.crc32(repr(vertex).encode()) % k
+
+
+def _bfs_shard_worker(conn, shard, report_vertices):
+    """
+    Run one shard of a sharded BFS in its own process
+
+    shard is a dict of vertex -> neighbours, or a function called here to load
+    one so the parent process never has to hold it. With report_vertices the
+    shard's vertex names are sent back first so the parent can route frontiers.
+
+    Each message is (level, candidates): candidates in this shard that are not
+    yet visited get that level, and the neighbours of the newly visited ones are
+    sent back. A None message ends the search and returns the distances
+    """
+    if callable(shard):
+        shard = shard()
+
+    if report_vertices:
+        conn.send(list(shard))
+
+    dist = dict()
+
+    while True:
+        message = conn.recv()
+
+        if message is None:
+            conn.send(dist)
+            conn.close()
+            return
+
+        level, candidates = message
+        neighbours = set()
+
+        for vertex in candidates:
+            if vertex not in dist and vertex in shard:
+                dist[vertex] = level
+                neighbours.update(shard[vertex])
+
+        conn.send(neighbours)
+
+
+def sharded_bfs(shards, v_start, owner=None) -> dict:
+    """
+    Return {vertex: distance from v_start} for every vertex a BFS from v_start
+    visits, running one local worker process per shard
+
+    Each shard is a dict of vertex -> neighbours or a function that builds one
+    inside its worker (e.g. by reading a file), so the whole graph never has to
+    be in a single process. owner maps a vertex to the index of its shard; by
+    default the workers report their vertex names and the owners are looked up.
+
+    The search is level synchronous: each level the frontier is sent to the
+    processes owning its vertices, and the neighbours they report back become
+    the next frontier. A neighbour that owner can not place in a shard raises
+    ValueError
+    """
+    connections = []
+    workers = []
+
+    try:
+        for shard in shards:
+            parent_conn, child_conn = multiprocessing.Pipe()
+            worker = multiprocessing.Process(target=_bfs_shard_worker,
+                                             args=(child_conn, shard, owner is None), daemon=True)
+            worker.start()
+            child_conn.close()
+            connections.append(parent_conn)
+            workers.append(worker)
+
+        # only vertex names are gathered here, never the neighbour lists
+        if owner is None:
+            owners = dict()
+            for index, conn in enumerate(connections):
+                for vertex in conn.recv():
+                    owners[vertex] = index
+
+            owner = owners.get
+
+        def shard_of(vertex):
+            # owner has to name one of the shards, otherwise the vertex can not be routed
+            index = owner(vertex)
+            if not isinstance(index, int) or not 0 <= index < len(connections):
+                raise ValueError(f'no shard owns vertex {vertex!r} (owner returned {index!r})')
+            return index
+
+        # element is not within graph
+        if owner(v_start) is None:
+            frontier = dict()
+        else:
+            frontier = {shard_of(v_start): {v_start}}
+
+        level = 0
+
+        while frontier:
+            for index, candidates in frontier.items():
+                connections[index].send((level, candidates))
+
+            # route the reported neighbours to the shards that own them
+            next_frontier = dict()
+            for index in frontier:
+                for vertex in connections[index].recv():
+                    next_frontier.setdefault(shard_of(vertex), set()).add(vertex)
+
+            frontier = next_frontier
+            level += 1
+
+        dist = dict()
+        for conn in connections:
+            conn.send(None)
+            dist.update(conn.recv())
+
+    except BaseException:
+        # the workers are still waiting for a frontier, and forked ones hold each
+        # other's pipe ends, so closing the pipes would not end them
+        for worker in workers:
+            worker.terminate()
+        raise
+
+    finally:
+        for conn in connections:
+            conn.close()
+        for worker in workers:
+            worker.join()
+
+    return dist
 
 
 class UndirectedGraph:
@@ -15,10 +198,33 @@ class UndirectedGraph:
     Class to implement undirected graph
     - duplicate edges not allowed
     - loops not allowed
-    - no edge weights
+    - optional edge weights, edges added without one weigh 1
     - vertex names are strings
+
+    Readers that run in other threads should traverse a snapshot() rather than
+    the live graph: writers take the write lock and invalidate the published
+    snapshot, readers use the immutable copy they grabbed without any locking
+
+    Memory: adj_list has to stay a dict of Python lists (the assignment fixes
+    __init__ and __str__), so each edge costs two list slots, about 40 bytes
+    with the dict entries, and a weighted edge adds a frozenset key and a dict
+    entry, about 270 bytes more. Only unweighted edges are cheap; there is no
+    compact array-backed store for this class
     """
 
+    __slots__ = ('adj_list', '_weights', '_version', '_snapshot', '_write_lock')
+
+    def __new__(cls, *args, **kwargs):
+        """
+        Set up the bookkeeping slots before __init__ runs
+        """
+        graph = super().__new__(cls)
+        graph._write_lock = threading.RLock()
+        graph._weights = dict()
+        graph._version = 0
+        graph._snapshot = None
+        return graph
+
     def __init__(self, start_edges=None):
         """
         Store graph info as adjacency list
@@ -50,70 +256,184 @@ class UndirectedGraph:
         """
         Add new vertex to the graph
         """
-        if v in self.adj_list:
-            return
-        else:
-            self.adj_list[v] = []
+        self._check_writable()
+
+        v = _intern(v)
+
+        with self._write_lock:
+            if v in self.adj_list:
+                return
+            else:
+                self.adj_list[v] = []
+                self._publish()
 
-    def add_edge(self, u: str, v: str) -> None:
+    def add_edge(self, u: str, v: str, weight=None) -> None:
         """
         Add edge to the graph
+        A weight given for an existing edge replaces its current weight,
+        a weight that is not a number raises TypeError
         """
+        self._check_writable()
 
         # u and v point to same vertex or u and v already have an edge between one another
         if u == v:
             return
 
-        # key u is not within the graph
-        if u not in self.adj_list:
-            self.add_vertex(u)
+        if weight is not None and (not isinstance(weight, numbers.Real) or isinstance(weight, bool)):
+            raise TypeError(f'edge weights must be numbers, got {weight!r}')
 
-        # key v is not within the graph
-        if v not in self.adj_list:
-            self.add_vertex(v)
+        u, v = _intern(u), _intern(v)
+
+        with self._write_lock:
+            # edge already exists with this weight -- nothing to publish
+            if u in self.adj_list and v in self.adj_list[u]:
+                if weight is None or self._weights.get(_edge_key(u, v)) == weight:
+                    return
+
+            # key u is not within the graph
+            if u not in self.adj_list:
+                self.add_vertex(u)
 
-        # append edges into the graph
-        if u not in self.adj_list[v]:
-            self.adj_list[v].append(u)
-        if v not in self.adj_list[u]:
-            self.adj_list[u].append(v)
+            # key v is not within the graph
+            if v not in self.adj_list:
+                self.add_vertex(v)
+
+            # append edges into the graph
+            if u not in self.adj_list[v]:
+                self.adj_list[v].append(u)
+            if v not in self.adj_list[u]:
+                self.adj_list[u].append(v)
+
+            if weight is not None:
+                self._weights[_edge_key(u, v)] = weight
+
+            self._publish()
 
     def remove_edge(self, v: str, u: str) -> None:
         """
         Remove edge from the graph
         """
+        self._check_writable()
 
-        # keys do not exist in graph
-        if v not in self.adj_list:
-            return
+        with self._write_lock:
+            # keys do not exist in graph
+            if v not in self.adj_list:
+                return
 
-        if u not in self.adj_list:
-            return
+            if u not in self.adj_list:
+                return
 
-        # u or v not present as an edge in either list
-        if u not in self.adj_list[v] or v not in self.adj_list[u]:
-            return
+            # u or v not present as an edge in either list
+            if u not in self.adj_list[v] or v not in self.adj_list[u]:
+                return
 
-        # remove edges from respective vertices
-        self.adj_list[v].remove(u)
-        self.adj_list[u].remove(v)
+            # remove edges from respective vertices
+            self.adj_list[v].remove(u)
+            self.adj_list[u].remove(v)
+            self._weights.pop(_edge_key(u, v), None)
+
+            self._publish()
 
     def remove_vertex(self, v: str) -> None:
         """
         Remove vertex and all connected edges
         """
-        if v not in self.adj_list:
-            return
+        self._check_writable()
+        with self._write_lock:
+            if v not in self.adj_list:
+                return
 
-        # grab the edges connected to v
-        edges_connected_to_v = self.adj_list[v]
+            # grab the edges connected to v
+            edges_connected_to_v = self.adj_list[v]
 
-        # remove v from each vertex
-        for vertex in edges_connected_to_v:
-            self.adj_list[vertex].remove(v)
+            # remove v from each vertex
+            for vertex in edges_connected_to_v:
+                self.adj_list[vertex].remove(v)
+                self._weights.pop(_edge_key(v, vertex), None)
 
-        # remove v from the graph altogether
-        self.adj_list.pop(v, None)
+            # remove v from the graph altogether
+            self.adj_list.pop(v, None)
+
+            self._publish()
+
+    def _check_writable(self) -> None:
+        """
+        Raise TypeError when called on a snapshot, which every reader shares
+        """
+        if self._snapshot is self:
+            raise TypeError('graph snapshots are read-only')
+
+    def _publish(self) -> None:
+        """
+        Bump the version and drop the published snapshot after a write
+        Callers must hold the write lock
+        """
+        self._version += 1
+        self._snapshot = None
+
+    def snapshot(self):
+        """
+        Return an immutable copy of the graph for lock-free reads
+
+        The copy is built once per version and shared by every reader until the
+        next write. Neighbour lists are stored as sorted tuples, so dfs() and bfs()
+        on the snapshot never have to sort
+        """
+
+        # grab the published snapshot without locking, writers replace it atomically
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+
+        with self._write_lock:
+            if self._snapshot is None:
+                snapshot = UndirectedGraph()
+                snapshot.adj_list = MappingProxyType(
+                    {vertex: tuple(sorted(edges)) for vertex, edges in self.adj_list.items()})
+                snapshot._weights = MappingProxyType(dict(self._weights))
+                snapshot._version = self._version
+                snapshot._snapshot = snapshot
+                self._snapshot = snapshot
+
+            return self._snapshot
+
+    @property
+    def version(self) -> int:
+        """
+        Return the number of writes applied to the graph so far
+        """
+        return self._version
+
+    def __getstate__(self):
+        """
+        Return the graph's data for pickling, e.g. to hand a snapshot to a
+        process pool. The lock is left out and __new__ makes a fresh one
+        """
+        return dict(self.adj_list), dict(self._weights), self._version, self._snapshot is self
+
+    def __setstate__(self, state):
+        """
+        Restore a pickled graph, snapshots come back immutable
+        """
+        adj_list, weights, self._version, frozen = state
+        self._snapshot = None
+
+        if frozen:
+            adj_list, weights = MappingProxyType(adj_list), MappingProxyType(weights)
+            self._snapshot = self
+
+        self.adj_list = adj_list
+        self._weights = weights
+
+    def get_weight(self, u: str, v: str):
+        """
+        Return the weight of edge u-v, 1 if it was added without one
+        and None if there is no such edge
+        """
+        if u not in self.adj_list or v not in self.adj_list[u]:
+            return None
+
+        return self._weights.get(_edge_key(u, v), 1)
 
     def get_vertices(self) -> []:
         """
@@ -153,51 +473,24 @@ class UndirectedGraph:
         Return true if provided path is valid, False otherwise
         """
 
-        # empty list is automatically true
-        if len(path) == 0:
-            return True
-
-        # grab the first value
-        prev_val = path[0]
-
-        # check if the first value is within the self.adj_list before moving on
-        if prev_val not in self.adj_list:
-            return False
-
-        # length of path is one
-        if len(path) == 1 and prev_val in self.adj_list:
-            return True
-
-        # start the counter and grab the next value
-        counter = 1
-        next_val = path[counter]
-
-        for key in path:
-
-            # store the length of the key's edges
-            length_of_edges = len(self.adj_list[key]) - 1
+        return _first_invalid_index(self.adj_list, path) is None
 
-            # grab the specified key's values
-            for value in self.adj_list[key]:
+    def validate_paths(self, paths, workers=None, chunk_size=10000) -> []:
+        """
+        Check many paths at once and return one (is_valid, failed_at) tuple per path
 
-                # match is found
-                if value == next_val:
-                    break
+        failed_at is the index of the first vertex in the path that does not exist
+        or is not a neighbour of the vertex before it, None for a valid path.
+        With workers > 1 the paths are checked in chunks across that many processes,
+        reading only a few chunks of paths ahead of the results
+        """
 
-                # we have reached the end of the array
-                if length_of_edges == 0:
-                    return False
+        # neighbour sets built once for the whole batch give O(1) edge lookups
+        neighbours = {vertex: frozenset(edges) for vertex, edges in self.snapshot().adj_list.items()}
 
-                # decrement length of edges
-                length_of_edges -= 1
+        failed = first_invalid_indices(_first_invalid_index, neighbours, paths, workers, chunk_size)
 
-            # have not yet reached the last key -- increment counter and grab the next value
-            # as to check for value as an edge of our next key within path
-            if counter + 1 < len(path):
-                counter += 1
-                next_val = path[counter]
-            else:
-                return True
+        return [(index is None, index) for index in failed]
 
     def dfs(self, v_start, v_end=None, check_for_cycle=False) -> []:
         """
@@ -220,11 +513,9 @@ class UndirectedGraph:
 
             # values exist within key and key is not yet in visited
             if len(self.adj_list[key]) > 0 and key not in visited:
-                key_edges = self.adj_list[key]
-
-                # sort the key's values in lexiographical order and reverse the order
-                key_edges.sort()
-                key_edges.reverse()
+                # sort a copy of the key's values in reverse lexiographical order,
+                # the adjacency list itself is left untouched for concurrent readers
+                key_edges = _sorted_neighbours(self.adj_list[key])[::-1]
 
                 # add this list onto the check_these_vertices list
                 check_these_vertices.extend(key_edges)
@@ -270,10 +561,8 @@ class UndirectedGraph:
 
             # values exist within key and key is not yet in visited
             if len(self.adj_list[key]) > 0 and key not in visited:
-                key_edges = self.adj_list[key]
-
-                # sort the key's values in lexiographical order
-                key_edges.sort()
+                # sort a copy of the key's values in lexiographical order
+                key_edges = _sorted_neighbours(self.adj_list[key])
 
                 for item in key_edges:
                     # add this list onto the check_these_vertices list
@@ -294,19 +583,283 @@ class UndirectedGraph:
         """
         Return number of connected componets in the graph
         """
-        vertices = self.get_vertices()
-        connected_components = set()
+        return len(self.connected_components())
+
+    def connected_components(self) -> []:
+        """
+        Return a list of connected components, each one a list of its
+        vertices in the order a BFS from its first vertex reaches them
+        """
+        components = []
+        visited = set()
+
+        for vertex in self.adj_list:
+            if vertex in visited:
+                continue
+
+            # plain BFS marking vertices as they are queued, so each is seen once
+            visited.add(vertex)
+            component = [vertex]
+            queue = deque(component)
+
+            while queue:
+                key = queue.popleft()
+
+                for neighbour in self.adj_list[key]:
+                    if neighbour not in visited:
+                        visited.add(neighbour)
+                        component.append(neighbour)
+                        queue.append(neighbour)
+
+            components.append(component)
+
+        return components
+
+    def spanning_forest(self, algorithm=None) -> ():
+        """
+        Return (edges, total_weight) for a minimum spanning forest of the graph,
+        with edges as (u, v, weight) tuples and one tree per connected component
+
+        algorithm is 'bfs', 'kruskal' or 'prim'. By default a graph without any
+        weights gets a BFS forest (every tree is minimal when all edges weigh 1),
+        sparse weighted graphs use Kruskal and dense ones heap-based Prim
+        """
+        if algorithm is None:
+            edge_count = sum(len(edges) for edges in self.adj_list.values()) // 2
+            vertex_count = len(self.adj_list)
+
+            if not self._weights:
+                algorithm = 'bfs'
+            elif edge_count > vertex_count * math.log2(max(vertex_count, 2)):
+                algorithm = 'prim'
+            else:
+                algorithm = 'kruskal'
+
+        if algorithm == 'bfs':
+            edges = self._bfs_forest()
+        elif algorithm == 'kruskal':
+            edges = self._kruskal_forest()
+        elif algorithm == 'prim':
+            edges = self._prim_forest()
+        else:
+            raise ValueError(f'unknown spanning forest algorithm: {algorithm!r}')
+
+        return edges, sum(weight for _, _, weight in edges)
+
+    def _bfs_forest(self) -> []:
+        """
+        Return the tree edges used by a BFS from the first vertex of every component
+        """
+        edges = []
+        visited = set()
+
+        for vertex in self.adj_list:
+            if vertex in visited:
+                continue
+
+            visited.add(vertex)
+            queue = deque([vertex])
+
+            while queue:
+                key = queue.popleft()
+
+                for neighbour in self.adj_list[key]:
+                    if neighbour not in visited:
+                        visited.add(neighbour)
+                        edges.append((key, neighbour, self.get_weight(key, neighbour)))
+                        queue.append(neighbour)
+
+        return edges
+
+    def _kruskal_forest(self) -> []:
+        """
+        Kruskal's algorithm: take edges lightest first, skipping any that would
+        join two vertices already in the same tree (tracked with union-find)
+        """
+        parent = {vertex: vertex for vertex in self.adj_list}
+        size = {vertex: 1 for vertex in self.adj_list}
+
+        def find(vertex):
+            # path halving keeps the trees flat
+            while parent[vertex] != vertex:
+                parent[vertex] = parent[parent[vertex]]
+                vertex = parent[vertex]
+            return vertex
+
+        # every edge once, ordered by weight alone so names are never compared
+        candidates = []
+        seen = set()
+        for u in self.adj_list:
+            for v in self.adj_list[u]:
+                key = _edge_key(u, v)
+                if key not in seen:
+                    seen.add(key)
+                    candidates.append((self.get_weight(u, v), u, v))
+
+        candidates.sort(key=lambda edge: edge[0])
+
+        edges = []
+
+        for weight, u, v in candidates:
+            root_u, root_v = find(u), find(v)
+
+            if root_u == root_v:
+                continue
+
+            # union by size, hang the smaller tree under the larger one
+            if size[root_u] < size[root_v]:
+                root_u, root_v = root_v, root_u
+
+            parent[root_v] = root_u
+            size[root_u] += size[root_v]
+            edges.append((u, v, weight))
+
+        return edges
+
+    def _prim_forest(self) -> []:
+        """
+        Prim's algorithm: grow a tree from each unvisited vertex, always adding
+        the lightest edge leaving the tree (kept in a heap)
+        """
+        edges = []
+        visited = set()
+        order = count()
+
+        for start in self.adj_list:
+            if start in visited:
+                continue
+
+            visited.add(start)
+
+            # the counter breaks weight ties so names are never compared
+            heap = [(self.get_weight(start, v), next(order), start, v) for v in self.adj_list[start]]
+            heapq.heapify(heap)
+
+            while heap:
+                weight, _, u, v = heapq.heappop(heap)
+
+                if v in visited:
+                    continue
+
+                visited.add(v)
+                edges.append((u, v, weight))
+
+                for neighbour in self.adj_list[v]:
+                    if neighbour not in visited:
+                        heapq.heappush(heap, (self.get_weight(v, neighbour), next(order), v, neighbour))
 
-        for vertex in vertices:
-            dfs = self.dfs(vertex)
-            dfs.sort()
+        return edges
 
-            key = ''.join(dfs)
+    def degree(self, v: str) -> int:
+        """
+        Return the number of edges at v, 0 if v is not in the graph
+        """
+        if v not in self.adj_list:
+            return 0
+
+        return len(self.adj_list[v])
 
-            if key not in connected_components:
-                connected_components.add(key)
+    def neighbors(self, v: str) -> []:
+        """
+        Return the neighbours of v in alphabetical order
+        """
+        if v not in self.adj_list:
+            return []
+
+        return sorted(self.adj_list[v])
+
+    def k_hop_neighborhood(self, v: str, k: int) -> dict:
+        """
+        Return {vertex: hops} for every vertex within k edges of v,
+        v itself included at 0 hops
+        """
+        if v not in self.adj_list:
+            return dict()
+
+        hops = {v: 0}
+        frontier = [v]
+
+        # expand one level at a time, reading only the frontier's neighbour lists
+        for level in range(1, k + 1):
+            next_frontier = []
+
+            for vertex in frontier:
+                for neighbour in self.adj_list[vertex]:
+                    if neighbour not in hops:
+                        hops[neighbour] = level
+                        next_frontier.append(neighbour)
+
+            frontier = next_frontier
+
+        return hops
+
+    def induced_subgraph(self, vertices):
+        """
+        Return a new graph with the given vertices that are in this graph and
+        every edge between them, keeping edge weights
+        """
+        # dict keeps the given order while dropping duplicates
+        kept = dict.fromkeys(vertex for vertex in vertices if vertex in self.adj_list)
+        subgraph = UndirectedGraph()
 
-        return len(connected_components)
+        for vertex in kept:
+            subgraph.add_vertex(vertex)
+
+            for neighbour in self.adj_list[vertex]:
+                if neighbour in kept:
+                    subgraph.add_edge(vertex, neighbour, self._weights.get(_edge_key(vertex, neighbour)))
+
+        return subgraph
+
+    def partition(self, k: int, method='hash') -> []:
+        """
+        Split the vertices into k shards and return them as a list of k dicts,
+        each mapping the shard's vertices to their neighbour lists
+
+        The shards share the graph's own neighbour lists rather than copying them,
+        so they cost one dict entry per vertex and must not outlive later writes.
+        method 'hash' assigns vertices with hash_owner(). 'locality' fills the
+        shards in BFS order, so neighbouring vertices tend to share a shard and
+        fewer frontier vertices have to cross between shards
+        """
+        if k < 1:
+            raise ValueError('k must be at least 1')
+
+        shards = [dict() for _ in range(k)]
+
+        if method == 'hash':
+            for vertex, edges in self.adj_list.items():
+                shards[hash_owner(vertex, k)][vertex] = edges
+
+        elif method == 'locality':
+            capacity = max(1, math.ceil(len(self.adj_list) / k))
+            index = 0
+
+            for component in self.connected_components():
+                for vertex in component:
+                    shards[index // capacity][vertex] = self.adj_list[vertex]
+                    index += 1
+
+        else:
+            raise ValueError(f'unknown partition method: {method!r}')
+
+        return shards
+
+    def sharded_bfs(self, v_start, k=2, method='hash') -> dict:
+        """
+        Return {vertex: distance from v_start} for every vertex bfs(v_start) visits,
+        splitting the graph with partition(k, method) and searching each shard
+        in its own process (see the module level sharded_bfs())
+
+        The shards are taken from snapshot(), so writers can keep going while
+        they are being sent to the workers
+        """
+        shards = self.snapshot().partition(k, method)
+
+        if method == 'hash':
+            return sharded_bfs(shards, v_start, lambda vertex: hash_owner(vertex, k))
+
+        return sharded_bfs(shards, v_start)
 
     def has_cycle(self):
         """
@@ -326,6 +879,20 @@ class UndirectedGraph:
 
         return False
 
+    async def count_connected_components_async(self, timeout=None, executor=None):
+        """
+        Awaitable count_connected_components() that runs in an executor
+        instead of blocking the event loop
+        """
+        return await run_coalesced(self, 'count_connected_components', timeout=timeout, executor=executor)
+
+    async def has_cycle_async(self, timeout=None, executor=None):
+        """
+        Awaitable has_cycle() that runs in an executor instead of blocking the event loop
+        """
+        return await run_coalesced(self, 'has_cycle', timeout=timeout, executor=executor)
+
+
 if __name__ == '__main__':
     # print("\nPDF - method add_vertex() / add_edge example 1")
     # print("----------------------------------------------")
@@ -421,3 +988,33 @@ if __name__ == '__main__':
         u, v = edge
         g.add_edge(u, v) if command == 'add' else g.remove_edge(u, v)
         print('{:<10}'.format(case), g.has_cycle())
+
+    import random
+
+    print("\nRANDOM - sharded_bfs() vs bfs()")
+    print("-------------------------------")
+    rng = random.Random(35)
+    for _ in range(20):
+        g = UndirectedGraph()
+        names = [f'V{index}' for index in range(rng.randint(1, 30))]
+        for name in names:
+            g.add_vertex(name)
+        for _ in range(rng.randint(0, 45)):
+            g.add_edge(rng.choice(names), rng.choice(names))
+
+        start = rng.choice(names)
+
+        # plain BFS levels to compare the distances against
+        expected = {start: 0}
+        queue = deque([start])
+        while queue:
+            key = queue.popleft()
+            for neighbour in g.adj_list[key]:
+                if neighbour not in expected:
+                    expected[neighbour] = expected[key] + 1
+                    queue.append(neighbour)
+
+        for method in ('hash', 'locality'):
+            dist = g.sharded_bfs(start, rng.randint(1, 4), method)
+            assert dist == expected and set(dist) == set(g.bfs(start)), (method, start, g)
+    print('20 random graphs match')